@@ -1,60 +1,116 @@
 import asyncio
+import aiofiles
 import aiohttp
-import json
+import gzip
+import hashlib
+import orjson
 import os
 import pandas as pd
+import pyarrow as pa
+from collections import deque
+from logic import format_evolution_conditions
 
 DATA_DIR = "data"
+HTTP_CACHE_DIR = os.path.join(DATA_DIR, ".cache")
 POKEAPI_BASE = "https://pokeapi.co/api/v2"
+JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+# 同時リクエスト数の上限（PokéAPI への負荷とレート制限対策）
+MAX_CONCURRENCY = 16
+sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+# 💾 レスポンスのディスクキャッシュ（PokéAPI のリソースは不変なので期限なし）
+def http_cache_path(url):
+    return os.path.join(HTTP_CACHE_DIR, hashlib.blake2b(url.encode()).hexdigest() + ".json")
+
+# 🧠 実行中の取得結果（URL ごとの Future。同じ URL への同時リクエストも 1 回にまとめる）
+_fetch_futures = {}
 
-# 🔁 リトライ付き JSON取得関数
 async def fetch_json(session, url, retries=3):
+    fut = _fetch_futures.get(url)
+    if fut is None:
+        fut = asyncio.ensure_future(_do_fetch(session, url, retries))
+        _fetch_futures[url] = fut
+    return await fut
+
+# 🔁 リトライ付き JSON取得関数
+async def _do_fetch(session, url, retries):
+    path = http_cache_path(url)
+    if os.path.exists(path):
+        async with aiofiles.open(path, "rb") as f:
+            return orjson.loads(await f.read())
+
     for attempt in range(retries):
         try:
-            async with session.get(url) as resp:
-                if resp.status == 200:
-                    return await resp.json()
-                else:
-                    print(f"Failed to fetch {url}: status {resp.status}")
-                    return None
+            async with sem:
+                async with session.get(url) as resp:
+                    if resp.status != 200:
+                        print(f"Failed to fetch {url}: status {resp.status}")
+                        return None
+                    body = await resp.read()
+            data = orjson.loads(body)
+            # 中断時に壊れたキャッシュが残らないよう一時ファイル経由で置き換える
+            tmp_path = path + ".tmp"
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(body)
+            os.replace(tmp_path, path)
+            return data
         except Exception as e:
             print(f"Error fetching {url} (attempt {attempt+1}/{retries}): {e}")
             await asyncio.sleep(1)
     return None
 
-# ✅ 安全な進化条件抽出関数
+# 📶 進捗表示付きで並列実行（結果は tasks の順序のまま返す）
+async def gather_with_progress(tasks, label):
+    done = 0
+
+    async def run(task):
+        nonlocal done
+        res = await task
+        done += 1
+        print(f"\r{label}: {done}/{len(tasks)}", end="")
+        return res
+
+    return await asyncio.gather(*(run(t) for t in tasks))
+
+# ✅ 安全な進化条件抽出関数（進化チェーンを幅優先で探索）
 def extract_evolution_condition_from_chain(chain_data, target_name, item_map):
-    def search(chain):
-        for evo in chain.get("evolves_to", []):
+    queue = deque([chain_data.get("chain", {})])
+    popleft, append = queue.popleft, queue.append
+    while queue:
+        node = popleft()
+        for evo in node.get("evolves_to", ()):
             species_name = evo.get("species", {}).get("name")
-            if species_name == target_name:
-                for detail in evo.get("evolution_details", []):
-                    item_data = detail.get("item")
-                    item = item_data.get("name") if item_data else None
-                    trigger_data = detail.get("trigger")
-                    trigger = trigger_data.get("name") if trigger_data else None
-                    level = detail.get("min_level")
-
-                    if item:
-                        return f"{item_map.get(item, item)}を使う"
-                    elif level:
-                        return f"Lv{level}で進化"
-                    elif trigger:
-                        return f"{trigger}で進化"
-                    else:
-                        return "進化条件不明"
-
-            result = search(evo)
-            if result:
-                return result
-        return "進化条件不明"
-
-    return search(chain_data.get("chain", {}))
-
-async def extract_form_info(session, form_detail, item_map, evolution_chain):
+            if species_name != target_name:
+                append(evo)
+                continue
+
+            for detail in evo.get("evolution_details", ()):
+                item_data = detail.get("item")
+                item = item_data.get("name") if item_data else None
+                trigger_data = detail.get("trigger")
+                trigger = trigger_data.get("name") if trigger_data else None
+                level = detail.get("min_level")
+
+                if item:
+                    return f"{item_map.get(item, item)}を使う"
+                elif level:
+                    return f"Lv{level}で進化"
+                elif trigger:
+                    return f"{trigger}で進化"
+                else:
+                    return "進化条件不明"
+            return "進化条件不明"
+    return "進化条件不明"
+
+async def extract_form_info(session, form_detail, item_map, evolution_chain, species_url, species_data):
     form_name_en = form_detail["name"]
     form_species_url = form_detail.get("species", {}).get("url")
-    form_species_data = await fetch_json(session, form_species_url) if form_species_url else None
+    # 元の種族と同じ URL なら取得済みの species_data を使い回す
+    if form_species_url == species_url:
+        form_species_data = species_data
+    else:
+        form_species_data = await fetch_json(session, form_species_url) if form_species_url else None
 
     form_name_ja = next(
         (n["name"] for n in form_species_data.get("names", []) if n["language"]["name"] == "ja-Hrkt"),
@@ -111,12 +167,12 @@ async def fetch_pokemon(session, pokemon_id, item_map):
         evolution_chain_url = species_data.get("evolution_chain", {}).get("url")
         evolution_chain = await fetch_json(session, evolution_chain_url) if evolution_chain_url else None
 
-        for variety in species_data.get("varieties", []):
-            form_url = variety["pokemon"]["url"]
-            form_detail = await fetch_json(session, form_url)
-            if form_detail:
-                form_info = await extract_form_info(session, form_detail, item_map, evolution_chain)
-                forms_data.append(form_info)
+        form_urls = [variety["pokemon"]["url"] for variety in species_data.get("varieties", [])]
+        form_details = await asyncio.gather(*(fetch_json(session, u) for u in form_urls))
+        forms_data = await asyncio.gather(*(
+            extract_form_info(session, form_detail, item_map, evolution_chain, species_url, species_data)
+            for form_detail in form_details if form_detail
+        ))
 
     return {
         "図鑑番号": data["id"],
@@ -128,7 +184,7 @@ async def fetch_pokemon(session, pokemon_id, item_map):
         "フォルム一覧": forms_data
     }
 
-async def fetch_pokemon_moves(session, pokemon_name, version_map):
+async def fetch_pokemon_moves(session, pokemon_name, version_map, move_name_map):
     url = f"{POKEAPI_BASE}/pokemon/{pokemon_name}"
     data = await fetch_json(session, url)
     if not data:
@@ -137,12 +193,7 @@ async def fetch_pokemon_moves(session, pokemon_name, version_map):
     moves_list = []
     for m in data.get("moves", []):
         move_name_en = m["move"]["name"]
-        move_url = m["move"]["url"]
-        move_data = await fetch_json(session, move_url)
-        move_name_ja = next(
-            (n["name"] for n in move_data.get("names", []) if n["language"]["name"] == "ja-Hrkt"),
-            move_name_en
-        )
+        move_name_ja = move_name_map.get(move_name_en, move_name_en)
 
         for version_detail in m.get("version_group_details", []):
             version_en = version_detail["version_group"]["name"]
@@ -166,8 +217,8 @@ async def fetch_all_items(session):
         return {}
 
     item_map = {}
-    for item in data["results"]:
-        item_data = await fetch_json(session, item["url"])
+    item_details = await asyncio.gather(*(fetch_json(session, item["url"]) for item in data["results"]))
+    for item_data in item_details:
         if not item_data:
             continue
         name_en = item_data["name"]
@@ -178,51 +229,129 @@ async def fetch_all_items(session):
         item_map[name_en] = name_ja
     return item_map
 
+async def fetch_all_moves(session):
+    url = f"{POKEAPI_BASE}/move?limit=10000"
+    data = await fetch_json(session, url)
+    if not data:
+        return {}
+
+    move_name_map = {}
+    move_details = await asyncio.gather(*(fetch_json(session, move["url"]) for move in data["results"]))
+    for move_data in move_details:
+        if not move_data:
+            continue
+        name_en = move_data["name"]
+        name_ja = next(
+            (n["name"] for n in move_data.get("names", []) if n["language"]["name"] == "ja-Hrkt"),
+            name_en
+        )
+        move_name_map[name_en] = name_ja
+    return move_name_map
+
+# 🈁 タイプの日本語訳を事前に付与（アプリ側で毎回翻訳しないため）
+def add_translated_types(pokemon_list, type_map):
+    for entry in pokemon_list:
+        entry["タイプ_ja"] = [type_map.get(t, t) for t in entry["タイプ"]]
+
+# 🌳 進化ツリーを表示順のノード列に展開し、進化条件も両言語分を事前計算
+def add_evolution_nodes(pokemon_list, item_map):
+    names = {entry["英語名"] for entry in pokemon_list}
+    for entry in pokemon_list:
+        nodes = []
+        chain = (entry["進化チェーン"] or {}).get("chain")
+        stack = [(chain, "", "")] if chain else []
+        while stack:
+            node, cond_ja, cond_en = stack.pop()
+            name_en = node["species"]["name"]
+            # キャッシュに無いポケモンはその先の進化ごと表示しない
+            if name_en not in names:
+                continue
+            nodes.append({
+                "name_en": name_en,
+                "condition_ja": cond_ja or "条件不明",
+                "condition_en": cond_en or "Unknown condition"
+            })
+            for evo in reversed(node.get("evolves_to", [])):
+                details = evo.get("evolution_details", [])
+                stack.append((
+                    evo,
+                    format_evolution_conditions(details, "日本語", item_map),
+                    format_evolution_conditions(details, "English", item_map)
+                ))
+        entry["進化ノード"] = nodes
+
+# 🗃️ ポケモン一覧を Arrow IPC（Feather v2）形式で保存
+def write_pokemon_table(pokemon_list, path):
+    table = pa.Table.from_pylist(pokemon_list)
+    # タイプは 18 種類しかないので辞書エンコード
+    for name in ("タイプ", "タイプ_ja"):
+        i = table.schema.get_field_index(name)
+        types = table.column(i).cast(pa.list_(pa.dictionary(pa.int32(), pa.string())))
+        table = table.set_column(i, name, types)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
 async def main():
-    os.makedirs(DATA_DIR, exist_ok=True)
-    async with aiohttp.ClientSession() as session:
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    # 同じホストへ連続して大量に投げるので keep-alive で接続を使い回す
+    connector = aiohttp.TCPConnector(limit=64, limit_per_host=32, keepalive_timeout=75, ttl_dns_cache=600)
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30)
+    headers = {"User-Agent": "poke-cache/1.0"}
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
         print("もちもの名取得中...")
         item_map = await fetch_all_items(session)
 
-        print("バージョングループ名読み込み中...")
+        print("バージョングループ名・タイプ名読み込み中...")
         version_path = os.path.join(DATA_DIR, "version_group_names.json")
-        with open(version_path, "r", encoding="utf-8") as f:
-            version_map = json.load(f)
+        with open(version_path, "rb") as f:
+            version_map = orjson.loads(f.read())
+        with open(os.path.join(DATA_DIR, "type_names.json"), "rb") as f:
+            type_map = orjson.loads(f.read())
 
         print("ポケモン情報取得開始...")
         pokemon_tasks = [fetch_pokemon(session, i, item_map) for i in range(1, 1026)]
-        pokemon_list = []
-        for i, task in enumerate(asyncio.as_completed(pokemon_tasks), 1):
-            res = await task
-            if res:
-                pokemon_list.append(res)
-            print(f"\r取得中: {i}/{len(pokemon_tasks)}", end="")
+        results = await gather_with_progress(pokemon_tasks, "取得中")
+        pokemon_list = [res for res in results if res]
         print("\nポケモン情報取得完了。")
 
         pokemon_list_sorted = sorted(pokemon_list, key=lambda x: x["図鑑番号"])
-        with open(os.path.join(DATA_DIR, "pokemon_cache.json"), "w", encoding="utf-8") as f:
-            json.dump(pokemon_list_sorted, f, ensure_ascii=False, indent=2)
+        add_translated_types(pokemon_list_sorted, type_map)
+        add_evolution_nodes(pokemon_list_sorted, item_map)
+        # JSON 版は gzip で圧縮して保存（Feather が無いときの読み込み用）
+        with gzip.open(os.path.join(DATA_DIR, "pokemon_cache.json.gz"), "wb", compresslevel=3) as f:
+            f.write(orjson.dumps(pokemon_list_sorted, option=JSON_OPTIONS))
+        # アプリ側はこちらを優先して読み込む（メモリマップで開けるよう非圧縮）
+        write_pokemon_table(pokemon_list_sorted, os.path.join(DATA_DIR, "pokemon_cache.feather"))
+
+        print("技名取得中...")
+        move_name_map = await fetch_all_moves(session)
 
         print("技情報取得開始...")
-        moves_all = []
-        for p in pokemon_list_sorted:
-            moves = await fetch_pokemon_moves(session, p["英語名"], version_map)
-            moves_all.extend(moves)
-            print(f"\r技取得中: {p['英語名']}", end="")
+        move_tasks = [fetch_pokemon_moves(session, p["英語名"], version_map, move_name_map) for p in pokemon_list_sorted]
+        results = await gather_with_progress(move_tasks, "技取得中")
+        moves_all = [m for moves in results for m in moves]
         print("\n技情報取得完了。")
 
-        df = pd.DataFrame(moves_all)
-        df.to_csv(os.path.join(DATA_DIR, "moves_cache.csv"), index=False, encoding="utf-8-sig")
+        # 値の種類が少ない列は category にして辞書エンコードで保存
+        df = pd.DataFrame(moves_all).astype({
+            "ポケモン": "category",
+            "バージョン": "category",
+            "習得方法": "category",
+            "技名": "category",
+            "技名_日本語": "category",
+            "習得レベル": "int16"
+        })
+        df.to_parquet(os.path.join(DATA_DIR, "moves_cache.parquet"), engine="pyarrow", compression="zstd")
 
-        with open(os.path.join(DATA_DIR, "move_names.json"), "w", encoding="utf-8") as f:
-            json.dump({row["技名"]: row["技名_日本語"] for row in moves_all}, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(DATA_DIR, "move_names.json"), "wb") as f:
+            f.write(orjson.dumps(move_name_map, option=JSON_OPTIONS))
 
-        with open(os.path.join(DATA_DIR, "item_names.json"), "w", encoding="utf-8") as f:
-            json.dump(item_map, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(DATA_DIR, "item_names.json"), "wb") as f:
+            f.write(orjson.dumps(item_map, option=JSON_OPTIONS))
 
         # version_map は既に読み込んだものを再保存（必要なら）
-        with open(os.path.join(DATA_DIR, "version_group_names.json"), "w", encoding="utf-8") as f:
-            json.dump(version_map, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(DATA_DIR, "version_group_names.json"), "wb") as f:
+            f.write(orjson.dumps(version_map, option=JSON_OPTIONS))
 
         print("✅ すべてのキャッシュ保存が完了しました！")
 
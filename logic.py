@@ -1,50 +1,126 @@
-import json
+import gzip
+import orjson
 import pandas as pd
+import pyarrow as pa
 import os
 from functools import lru_cache
+from typing import NamedTuple
 
 DATA_DIR = "data"
 
+# 🔽 ポケモン 1 匹分のエントリ（dict より省メモリで属性アクセスできる）
+class Entry(NamedTuple):
+    id: int
+    name_en: str
+    name_ja: str
+    types: tuple
+    types_ja: tuple
+    img: str
+    evo_chain: dict
+    evo_nodes: tuple
+    forms: tuple
+
+def _entry_from_row(row):
+    return Entry(
+        id=row["図鑑番号"],
+        name_en=row["英語名"],
+        name_ja=row["日本語名"],
+        types=tuple(row["タイプ"]),
+        types_ja=tuple(row["タイプ_ja"]),
+        img=row["画像"],
+        evo_chain=row["進化チェーン"],
+        evo_nodes=tuple(row["進化ノード"]),
+        forms=tuple(row["フォルム一覧"] or ())
+    )
+
+# 🔽 ポケモンキャッシュの読み取りビュー（Entry は参照されたときに一度だけ作る）
+class PokemonCache:
+    def __init__(self, table):
+        self._table = table
+        self._entries = [None] * table.num_rows
+
+    def __len__(self):
+        return self._table.num_rows
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        i %= len(self)
+        entry = self._entries[i]
+        if entry is None:
+            entry = self._entries[i] = _entry_from_row(self._table.slice(i, 1).to_pylist()[0])
+        return entry
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def column(self, name):
+        return self._table.column(name).to_pylist()
+
 # 🔽 キャッシュ読み込み関数群
 @lru_cache(maxsize=None)
 def load_pokemon_cache():
-    path = os.path.join(DATA_DIR, "pokemon_cache.json")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    # Feather（Arrow IPC）があればメモリマップで開く、なければ JSON から組み立てる
+    feather_path = os.path.join(DATA_DIR, "pokemon_cache.feather")
+    if os.path.exists(feather_path):
+        return PokemonCache(pa.ipc.open_file(pa.memory_map(feather_path)).read_all())
+
+    path = os.path.join(DATA_DIR, "pokemon_cache.json.gz")
+    with gzip.open(path, "rb") as f:
+        return PokemonCache(pa.Table.from_pylist(orjson.loads(f.read())))
 
 @lru_cache(maxsize=None)
 def load_moves_cache():
-    path = os.path.join(DATA_DIR, "moves_cache.csv")
-    return pd.read_csv(path, encoding="utf-8-sig")
+    path = os.path.join(DATA_DIR, "moves_cache.parquet")
+    # (ポケモン名, バージョン) で引けるようソート済みインデックスにしておく
+    return pd.read_parquet(path, engine="pyarrow").set_index(["ポケモン", "バージョン"]).sort_index(kind="stable")
+
+# 🔽 翻訳用マップ（初回アクセス時にまとめて一度だけ読み込む）
+_MAP_FILES = {
+    "item": "item_names.json",
+    "version_group": "version_group_names.json",
+    "type": "type_names.json",
+    "move": "move_names.json"
+}
+_MAPS = {}
+
+def _ensure_loaded():
+    if _MAPS:
+        return
+    for key, filename in _MAP_FILES.items():
+        with open(os.path.join(DATA_DIR, filename), "rb") as f:
+            _MAPS[key] = orjson.loads(f.read())
 
-@lru_cache(maxsize=None)
 def load_item_name_map():
-    path = os.path.join(DATA_DIR, "item_names.json")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    _ensure_loaded()
+    return _MAPS["item"]
 
-@lru_cache(maxsize=None)
 def load_version_group_map():
-    path = os.path.join(DATA_DIR, "version_group_names.json")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    _ensure_loaded()
+    return _MAPS["version_group"]
 
-@lru_cache(maxsize=None)
 def load_type_name_map():
-    path = os.path.join(DATA_DIR, "type_names.json")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    _ensure_loaded()
+    return _MAPS["type"]
 
-@lru_cache(maxsize=None)
 def load_move_name_map():
-    path = os.path.join(DATA_DIR, "move_names.json")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    _ensure_loaded()
+    return _MAPS["move"]
 
 # 🔽 翻訳補助関数
 def safe_translate(name, mapping):
     return mapping.get(name, name)
 
+# 🔽 カテゴリ列の翻訳（行ごとではなくカテゴリ値ごとに一度だけ変換）
+def translate_categories(series, mapping):
+    series = series.cat.remove_unused_categories()
+    translated = [safe_translate(c, mapping) for c in series.cat.categories]
+    if len(set(translated)) != len(translated):
+        # 訳語が重複するとカテゴリ名に使えないので通常の変換に戻す
+        return series.map(lambda x: safe_translate(x, mapping))
+    return series.cat.rename_categories(translated)
+
 # 🔽 習得方法マップ
 def get_method_map(lang):
     return {
@@ -54,40 +130,58 @@ def get_method_map(lang):
         "egg": "遺伝" if lang == "日本語" else "Egg"
     }
 
-# 🔽 ポケモン検索（修正済み：3引数対応）
-def get_pokemon_by_name_or_id(query, lang, cache):
+# 🔽 検索用インデックス（図鑑番号・英語名・日本語名 → 行番号）
+class PokemonIndex(NamedTuple):
+    by_id: dict
+    by_en: dict
+    by_ja: dict
+    raw: PokemonCache
+
+    # 英語名でエントリを取得（dict.get と同じ使い方）
+    def get(self, name_en, default=None):
+        i = self.by_en.get(name_en.lower())
+        return default if i is None else self.raw[i]
+
+def build_pokemon_index(raw):
+    # 行全体は読まず、検索キーの列だけから組み立てる
+    ids = raw.column("図鑑番号")
+    names_en = raw.column("英語名")
+    names_ja = raw.column("日本語名")
+    return PokemonIndex(
+        by_id={str(v): i for i, v in enumerate(ids)},
+        by_en={v.lower(): i for i, v in enumerate(names_en)},
+        by_ja={v.lower(): i for i, v in enumerate(names_ja) if v},
+        raw=raw
+    )
+
+# 🔽 ポケモン検索（図鑑番号 → 英語名 → 日本語名の順に引く）
+def get_pokemon_by_name_or_id(query, lang, index):
     q = query.strip().lower()
-    for e in cache.values():
-        if str(e["図鑑番号"]) == q or e["英語名"].lower() == q:
-            return _make_entry(e, lang)
-        if lang == "日本語" and e["日本語名"].lower() == q:
-            return _make_entry(e, lang)
-    return None
+    i = index.by_id.get(q)
+    if i is None:
+        i = index.by_en.get(q)
+    if i is None and lang == "日本語":
+        i = index.by_ja.get(q)
+    return _make_entry(index.raw[i], lang) if i is not None else None
 
 # 🔽 表示用エントリ整形
 def _make_entry(entry, lang):
-    type_map = load_type_name_map()
-    translated_types = translate_types(entry["タイプ"], lang, type_map)
-
     return {
-        "id": entry["図鑑番号"],
-        "name_en": entry["英語名"],
-        "name": entry["日本語名"] if lang == "日本語" else entry["英語名"],
-        "types": translated_types,
-        "img": entry["画像"],
-        "evolution_chain": entry["進化チェーン"],
-        "フォルム一覧": entry.get("フォルム一覧", [])
+        "id": entry.id,
+        "name_en": entry.name_en,
+        "name": entry.name_ja if lang == "日本語" else entry.name_en,
+        "types": localized_types(entry, lang),
+        "img": entry.img,
+        "evolution_chain": entry.evo_chain,
+        "フォルム一覧": list(entry.forms)
     }
 
-# 🔽 タイプ翻訳
-def translate_types(types, lang, type_map):
-    if lang == "日本語":
-        return [safe_translate(t, type_map) for t in types]
-    return types
+# 🔽 表示言語に応じたタイプ名（日本語訳はキャッシュ生成時に付与済み）
+def localized_types(entry, lang):
+    return list(entry.types_ja if lang == "日本語" else entry.types)
 
 # 🔽 進化条件の整形
-def format_evolution_conditions(details, lang):
-    item_map = load_item_name_map()
+def format_evolution_conditions(details, lang, item_map):
     if not details:
         return "条件不明" if lang == "日本語" else "Unknown condition"
 
@@ -129,40 +223,35 @@ def format_evolution_conditions(details, lang):
 
     return "、".join(texts) if lang == "日本語" else "; ".join(texts)
 
-# 🔽 進化ツリー構築
-def get_evolution_tree(base_en, lang, cache_dict, item_map):
-    tree = []
+# 🔽 進化ツリー構築（ノード列と進化条件はキャッシュ生成時に計算済み）
+def get_evolution_tree(base_en, lang, cache_dict):
     root = cache_dict.get(base_en)
     if not root:
-        return tree
-
-    chain = root["進化チェーン"].get("chain", {})
+        return []
 
-    def traverse(node, cond=""):
-        name_en = node["species"]["name"]
-        entry = cache_dict.get(name_en)
+    cond_key = "condition_ja" if lang == "日本語" else "condition_en"
+    tree = []
+    for node in root.evo_nodes:
+        entry = cache_dict.get(node["name_en"])
         if not entry:
-            return
-
+            continue
         tree.append({
-            "name": entry["日本語名"] if lang == "日本語" else entry["英語名"],
-            "name_en": name_en,
-            "id": entry["図鑑番号"],
-            "img": entry["画像"],
-            "types": translate_types(entry["タイプ"], lang, load_type_name_map()),
-            "condition": cond or ("条件不明" if lang == "日本語" else "Unknown condition")
+            "name": entry.name_ja if lang == "日本語" else entry.name_en,
+            "name_en": entry.name_en,
+            "id": entry.id,
+            "img": entry.img,
+            "types": localized_types(entry, lang),
+            "condition": node[cond_key]
         })
-
-        for evo in node.get("evolves_to", []):
-            next_cond = format_evolution_conditions(evo.get("evolution_details", []), lang)
-            traverse(evo, next_cond)
-
-    traverse(chain)
     return tree
 
-# 🔽 技一覧取得（言語対応・翻訳付き）
-def get_moves_for_pokemon(name_en, lang, moves_df, version_group_map, move_name_map=None):
-    df = moves_df[moves_df["ポケモン"] == name_en].copy()
+# 🔽 技一覧取得（言語対応・翻訳付き、version 指定時はそのバージョンのみ）
+def get_moves_for_pokemon(name_en, lang, moves_df, version_group_map, move_name_map=None, version=None):
+    key = name_en if version is None else (name_en, version)
+    try:
+        df = moves_df.loc[[key]].reset_index()
+    except KeyError:
+        df = moves_df.iloc[0:0].reset_index()
     if df.empty:
         cols = (
             ["ポケモン", "技名", "バージョン", "習得レベル", "習得方法"]
@@ -171,16 +260,17 @@ def get_moves_for_pokemon(name_en, lang, moves_df, version_group_map, move_name_
         )
         return pd.DataFrame(columns=cols)
 
-    df["バージョン"] = df["バージョン"].map(lambda x: safe_translate(x, version_group_map))
+    df["バージョン"] = translate_categories(df["バージョン"], version_group_map)
     method_map = get_method_map(lang)
 
     if lang == "日本語":
-        df["習得方法"] = df["習得方法"].map(lambda x: safe_translate(x, method_map))
+        df["習得方法"] = translate_categories(df["習得方法"], method_map)
         if move_name_map:
-            df["技名"] = df["技名"].map(lambda x: safe_translate(x, move_name_map))
+            df["技名"] = translate_categories(df["技名"], move_name_map)
         df = df[["ポケモン", "技名", "バージョン", "習得レベル", "習得方法"]]
     else:
-        df["習得方法"] = df["習得方法"].map(lambda x: safe_translate(x, method_map))
+        df["習得方法"] = translate_categories(df["習得方法"], method_map)
+        df = df[["ポケモン", "技名", "技名_日本語", "バージョン", "習得レベル", "習得方法"]]
         df = df.rename(columns={
             "ポケモン": "Pokemon",
             "技名": "Move",
@@ -1,13 +1,12 @@
 import streamlit as st
 import pandas as pd
-import json
-import os
 from logic import (
     load_pokemon_cache,
     load_moves_cache,
-    load_item_name_map,
     load_version_group_map,
     load_type_name_map,
+    load_move_name_map,
+    build_pokemon_index,
     get_pokemon_by_name_or_id,
     get_evolution_tree,
     get_moves_for_pokemon
@@ -17,45 +16,45 @@ from logic import (
 st.set_page_config(page_title="ポケモン進化ツリー表示", layout="wide")
 st.markdown("<h1 style='font-size:40px;'>🌱 ポケモン進化ツリー表示アプリ</h1>", unsafe_allow_html=True)
 
-# データ読み込み関数
-@st.cache_data
+# データ読み込み関数（メモリマップしたテーブルを共有するためコピーせず保持）
+@st.cache_resource
 def load_pokemon_data():
-    raw_data = load_pokemon_cache()
-    return {entry["英語名"]: entry for entry in raw_data}
-
-@st.cache_data
-def load_move_name_map():
-    path = os.path.join("data", "move_names.json")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return build_pokemon_index(load_pokemon_cache())
 
 # データ読み込み
 pokemon_data   = load_pokemon_data()
 moves_data     = load_moves_cache()
-item_map       = load_item_name_map()
 version_map    = load_version_group_map()
 type_name_map  = load_type_name_map()
 move_name_map  = load_move_name_map()
 
+# 検索結果と進化ツリーは (入力, 言語) ごとにキャッシュ（pokemon_data は不変なのでキーに含めない）
+@st.cache_data
+def cached_lookup(query, lang):
+    return get_pokemon_by_name_or_id(query, lang, pokemon_data)
+
+@st.cache_data
+def cached_tree(name_en, lang):
+    return get_evolution_tree(name_en, lang, pokemon_data)
+
 # 表示言語選択
 lang = st.selectbox("表示言語を選択", ["日本語", "English"])
 
 # 検索フォーム
 with st.form("search_form", clear_on_submit=False):
     user_input = st.text_input("ポケモン名またはIDを入力（例：ピカチュウ / Eevee / 25）")
-    version_col = "バージョン" if lang == "日本語" else "Version"
-    all_versions = moves_data["バージョン"].unique() if not moves_data.empty else []
+    all_versions = moves_data.index.levels[1] if not moves_data.empty else []
     version_labels = sorted({ version_map.get(v, v) for v in all_versions })
     version_filter = st.selectbox("技のバージョンで絞り込み（任意）", ["すべて"] + version_labels)
     submitted = st.form_submit_button("検索")
 
 # 検索処理
 if submitted and user_input:
-    entry = get_pokemon_by_name_or_id(user_input, lang, pokemon_data)
+    entry = cached_lookup(user_input, lang)
     if entry is None:
         st.error("ポケモンが見つかりませんでした。" if lang == "日本語" else "Pokemon not found.")
     else:
-        evolution_tree = get_evolution_tree(entry["name_en"], lang, pokemon_data, item_map)
+        evolution_tree = cached_tree(entry["name_en"], lang)
 
         # 進化ツリー表示
         st.subheader("進化ツリー" if lang == "日本語" else "Evolution Tree")
@@ -79,15 +78,14 @@ if submitted and user_input:
 
             # 技一覧表示
             st.markdown("#### 🌀 覚えられる技一覧" if lang == "日本語" else "#### 🌀 Learnable Moves")
-            moves_df = get_moves_for_pokemon(node["name_en"], lang, moves_data, version_map, move_name_map)
+            moves_df = get_moves_for_pokemon(
+                node["name_en"], lang, moves_data, version_map, move_name_map,
+                version=None if version_filter == "すべて" else version_filter
+            )
 
+            # 表示中のポケモン 1 匹分の技なので、名前はノードの日本語名で埋める
             if "ポケモン" in moves_df.columns:
-                moves_df["ポケモン"] = moves_df["ポケモン"].map(
-                    lambda name_en: pokemon_data.get(name_en, {}).get("日本語名", name_en)
-                )
-
-            if version_filter != "すべて" and version_col in moves_df.columns:
-                moves_df = moves_df[moves_df[version_col] == version_filter]
+                moves_df["ポケモン"] = node["name"]
 
             if not moves_df.empty:
                 st.dataframe(moves_df, use_container_width=True)